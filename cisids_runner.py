@@ -1,12 +1,19 @@
 import pandas as pd
-from cyber_management_agents2 import build_graph
+from cyber_management_agents2 import build_graph, surrogate, correlator
+from dataset_store import load_dataset
+from flow_record import FlowBatch
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # -----------------------------
 # 1) Load & sample dataset
 # -----------------------------
-df = pd.read_csv("cis-ids2018.csv")
+# Uses cis-ids2018.parquet if present (python3 dataset_store.py converts once),
+# otherwise parses the CSV. Optional predicate pushdown, e.g.:
+#   FILTERS = [("Dst Port", "in", [21, 22])]
+#   FILTERS = [("Label", "==", "FTP-BruteForce")]
+FILTERS = None
+df = load_dataset("cis-ids2018.csv", "cis-ids2018.parquet", filters=FILTERS)
 
 # Optional: small sample for testing
 df = df.sample(30, random_state=42).reset_index(drop=True)
@@ -21,19 +28,17 @@ results = []
 # -----------------------------
 # 3) Run inference (NO LABEL LEAKAGE)
 # -----------------------------
-for _, row in df.iterrows():
-    # Convert row to dictionary
-    row_dict = row.to_dict()
+# Column arrays instead of per-row dicts; the label is kept apart from the features
+true_labels = df["Label"].to_numpy() if "Label" in df.columns else [None] * len(df)
+flows = FlowBatch.from_frame(df, exclude=("Label",))
 
-    # Extract and REMOVE true label
-    true_label = row_dict.pop("Label", None)
-
-    # Safety check (prevents accidental leakage)
-    assert "Label" not in row_dict, "🚨 Label leaked into agent input!"
+# Safety check (prevents accidental leakage)
+assert "Label" not in flows, "🚨 Label leaked into agent input!"
 
+for flow, true_label in zip(flows, true_labels):
     # Invoke agent graph with label-free data
     output = agent_graph.invoke({
-        "raw_row": row_dict,   # ✅ agents see features only
+        "flow": flow,   # ✅ agents see features only
         "log": []
     })
 
@@ -45,7 +50,9 @@ for _, row in df.iterrows():
         "processed_event": output["processed_event"],
         "reasoning": output["threat_report"]["reasoning"],
         "confidence": output["threat_report"]["confidence"],
-        "response": output["response_decision"]["response"]
+        "response": output["response_decision"]["response"],
+        "verdict_source": output.get("verdict_source", "llm"),
+        "incident_id": output.get("incident", {}).get("incident_id")
     })
 
 # -----------------------------
@@ -56,6 +63,12 @@ results_df.to_csv("results/llm_ids_results4.csv", index=False)
 
 print("✅ CIC-IDS2018 LLM evaluation complete")
 
+# persist the surrogate distilled from this run's LLM verdicts
+if surrogate.has_unsaved_updates:
+    print(f"💾 Surrogate model saved to {surrogate.save()}")
+print(f"🧩 Incidents opened: {correlator.total_incidents}")
+print(f"🤖 Flows answered by surrogate: {(results_df['verdict_source'] == 'surrogate').mean():.1%}")
+
 # -----------------------------
 # 5) Display summary
 # -----------------------------
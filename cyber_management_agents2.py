@@ -4,14 +4,16 @@ File: cyber_management_agents2.py
 input: CIS-IDS2018.csv
 
 Agents:
+0. SurrogateGate (local model distilled from LLM verdicts, see surrogate_model.py)
 1. EventProcessingAgent (Ingest + Clean)
 2. ThreatCognibstiveAgent (Detect + Analyse)
+   IncidentCorrelator (group malicious flows into incidents, see incident_correlator.py)
 3. ResponseDecisionAgent
 4. EnforcementAgent
 5. AuditLearningAgent
 
 Requirements:
-    pip install langgraph openai python-dotenv sentence-transformers faiss-cpu pandas
+    pip install langgraph openai httpx python-dotenv sentence-transformers faiss-cpu pandas
 
 Run:
     cd /Users/yilinli/honours
@@ -19,64 +21,98 @@ Run:
     python3 cisids_runner.py
 """
 
-from typing import TypedDict, Dict, Any, List
+from typing import TypedDict, Dict, Any, List, Optional
 import time
 import json
 
 from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
 from dotenv import load_dotenv
 from rag_retriever import ThreatRAG
-import os
+from llm_transport import LLMTransport
+from surrogate_model import SurrogateClassifier, NUMERIC_FEATURES, FLAG_FEATURES
+from incident_correlator import IncidentCorrelator, NEW, ESCALATED, ONGOING
+from flow_record import FlowRecord
 rag = ThreatRAG()
+surrogate = SurrogateClassifier.load_latest("models")
+correlator = IncidentCorrelator(window_s=300, escalation_factor=10)
+# how long a flow joining an incident waits for that incident's first decision
+INCIDENT_DECISION_WAIT_S = 120
 
 # -----------------------------
 # LLM Client
 # -----------------------------
+# Endpoints come from LLM_ENDPOINTS, or OPENAI_API_KEY as a single endpoint.
+# See llm_transport.py for pooling, load balancing, rate limits and retries.
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OPENAI_API_KEY in .env")
-client = OpenAI(api_key=OPENAI_API_KEY)
+transport = LLMTransport.from_env()
 
 def llm_call(system_prompt: str, user_prompt: str) -> dict:
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0,
-    )
-
-    content = response.choices[0].message.content.strip()
-
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        print("⚠️ LLM returned invalid JSON:")
-        print(content)
-        raise
+    return transport.chat_json(system_prompt, user_prompt, temperature=0)
 
 
 # -----------------------------
 # State Definition
 # -----------------------------
 class CyberState(TypedDict, total=False):
-    # Input
-    raw_row: Dict[str, Any]
+    # Input: compact view of one CIC-IDS2018 row (features only, no Label)
+    flow: FlowRecord
 
     # true label
     true_label: Dict[str, Any]
 
+    # surrogate routing: "llm" or "surrogate", plus the surrogate's guess (for spot checks)
+    verdict_source: str
+    surrogate_route: Dict[str, Any]
+
     # agent outputs
     processed_event: Dict[str, Any]
     threat_report: Dict[str, Any]
+    incident: Dict[str, Any]
     response_decision: Dict[str, Any]
     enforcement_result: Dict[str, Any]
     log: List[Dict[str, Any]]
 
 
+# -----------------------------
+# 0) Surrogate Gate
+# -----------------------------
+def surrogate_gate(state: CyberState, surrogate_model: Optional[SurrogateClassifier] = None) -> CyberState:
+    """
+    Let the local surrogate answer flows from regions where it has been
+    agreeing with the LLM; everything else (and spot checks) goes to the LLM.
+    """
+    surrogate_model = surrogate if surrogate_model is None else surrogate_model
+    route = surrogate_model.route(state["flow"])
+    state["surrogate_route"] = route
+
+    if not route["use_surrogate"]:
+        state["verdict_source"] = "llm"
+        return state
+
+    cls, prob = route["prediction"]
+    row = state["flow"]
+    state["verdict_source"] = "surrogate"
+    state["processed_event"] = {
+        key: row.get(key) for key in ["Dst Port", "Protocol"] + NUMERIC_FEATURES + FLAG_FEATURES
+        if key in row
+    }
+    state["threat_report"] = {
+        "label": "benign" if cls == "benign" else "malicious",
+        "attack_type": "none" if cls == "benign" else cls,
+        "confidence": round(prob * 100),
+        "reasoning": (
+            f"Local surrogate model v{surrogate_model.version} "
+            f"(region {route['region']} agreement "
+            f"{surrogate_model.regions[route['region']]['agreement']:.0%} with LLM verdicts)"
+        ),
+    }
+    return state
+
+
+def route_after_gate(state: CyberState) -> str:
+    return "correlate" if state.get("verdict_source") == "surrogate" else "event_processing"
+
+
 # -----------------------------
 # 1) Event Processing Agent
 # -----------------------------
@@ -86,7 +122,7 @@ def event_processing_agent(state: CyberState) -> CyberState:
             "You must output structured, valid JSON only.")
     user = f"""
             Raw CIC-IDS2018 network flow row:
-            {json.dumps(state["raw_row"], indent=2)}
+            {state["flow"].to_json()}
 
         Tasks:
         - Select 10-15 features relevant to intrusion detection. HOWEVER, if available in raw data, ALWAYS include:
@@ -253,15 +289,58 @@ def threat_intelligence_agent(state: CyberState) -> CyberState:
     return state
 
 
+# -----------------------------
+# 2b) Incident Correlation
+# -----------------------------
+def incident_correlation(state: CyberState, incident_correlator: Optional[IncidentCorrelator] = None) -> CyberState:
+    """
+    Attach malicious flows to an incident. Benign flows and flows joining an
+    ongoing incident skip decision/enforcement and reuse a cached result.
+    If the incident's first decision is still in flight (parallel workers),
+    the flow waits for it; it is recorded as "undecided" if that decision
+    fails or does not arrive within INCIDENT_DECISION_WAIT_S.
+    """
+    if str(state["threat_report"].get("label", "")).strip().lower() != "malicious":
+        state["incident"] = {"incident_id": None, "status": "none"}
+        state["response_decision"] = {"response": "ignore", "justification": "Benign verdict; no incident opened."}
+        state["enforcement_result"] = {"action": "none", "target": "none", "mechanism": "none",
+                                       "detailed action": "none", "status": "skipped"}
+        return state
+
+    incident_correlator = correlator if incident_correlator is None else incident_correlator
+    incident = incident_correlator.correlate(state["flow"], state.get("processed_event", {}), state["threat_report"])
+    state["incident"] = incident
+
+    if incident["status"] == ONGOING:
+        decision, enforcement = incident_correlator.cached_response(incident["incident_id"], timeout=INCIDENT_DECISION_WAIT_S)
+        state["response_decision"] = decision or {
+            "response": "undecided",
+            "justification": f"No decision for {incident['incident_id']} within {INCIDENT_DECISION_WAIT_S}s.",
+        }
+        enforcement = enforcement or {"action": "none", "target": incident["source"]}
+        if enforcement.get("status") != "abandoned":
+            enforcement = dict(enforcement, status="covered_by_incident")
+        state["enforcement_result"] = enforcement
+    return state
+
+
+def route_after_correlation(state: CyberState) -> str:
+    return "decision" if state["incident"]["status"] in (NEW, ESCALATED) else "audit"
+
+
 # -----------------------------
 # 3) Response Decision Agent
 # -----------------------------
 def response_decision_agent(state: CyberState) -> CyberState:
     system = "You are a SOC response decision agent."
+    incident = {k: v for k, v in state.get("incident", {}).items() if k != "status"}
     user = f"""
 Threat intelligence report:
 {json.dumps(state["threat_report"], indent=2)}
 
+Correlated incident ({state.get("incident", {}).get("status", NEW)}):
+{json.dumps(incident, indent=2)}
+
 Tasks:
 - Decide response: block, alert, monitor, or ignore
 - Justify the decision based on risk
@@ -319,12 +398,31 @@ No explanations. No markdown.
 # -----------------------------
 # 5) Audit & Learning Agent / Evaluation agent
 # -----------------------------
-def audit_learning_agent(state: CyberState) -> CyberState:
+def audit_learning_agent(
+    state: CyberState,
+    surrogate_model: Optional[SurrogateClassifier] = None,
+    incident_correlator: Optional[IncidentCorrelator] = None,
+) -> CyberState:
+    surrogate_model = surrogate if surrogate_model is None else surrogate_model
+    incident_correlator = correlator if incident_correlator is None else incident_correlator
+
+    # distil LLM verdicts into the surrogate (its own verdicts are never trained on)
+    if state.get("verdict_source", "llm") == "llm" and state.get("threat_report"):
+        surrogate_model.observe(state["flow"], state["threat_report"])
+
+    # cache the per-incident decision for later flows of the same incident
+    incident = state.get("incident", {})
+    if incident.get("status") in (NEW, ESCALATED):
+        incident_correlator.record_response(incident["incident_id"], state["response_decision"], state["enforcement_result"])
+
     entry = {
         "timestamp": time.time(),
-        "raw_row": state.get("raw_row"),
+        "verdict_source": state.get("verdict_source", "llm"),
+        "surrogate_route": state.get("surrogate_route"),
+        "flow": state.get("flow"),  # reference only; serialise with flow.to_dict() when needed
         "processed_event": state.get("processed_event"),
         "threat_report": state.get("threat_report"),
+        "incident": state.get("incident"),
         "response_decision": state.get("response_decision"),
         "enforcement_result": state.get("enforcement_result"),
     }
@@ -357,18 +455,50 @@ def flow_row_to_text(row):
 # -----------------------------
 # Build LangGraph Pipeline
 # -----------------------------
-def build_graph():
+def release_incident_on_failure(node, incident_correlator: IncidentCorrelator):
+    """
+    Wrap a node on the decision path so that, if it raises, flows waiting for
+    this incident's decision are released (see IncidentCorrelator.abandon)
+    instead of waiting INCIDENT_DECISION_WAIT_S. The error is re-raised.
+    """
+    def run(state: CyberState) -> CyberState:
+        try:
+            return node(state)
+        except Exception as e:
+            incident = state.get("incident") or {}
+            if incident.get("status") in (NEW, ESCALATED):
+                incident_correlator.abandon(incident["incident_id"], f"{type(e).__name__}: {e}")
+            raise
+    return run
+
+
+def build_graph(
+    surrogate_model: Optional[SurrogateClassifier] = None,
+    incident_correlator: Optional[IncidentCorrelator] = None,
+):
+    """
+    Compile the pipeline. By default it uses the module-level `surrogate`
+    and `correlator`; pass other instances to run with isolated state
+    (e.g. one per load-test run).
+    """
+    surrogate_model = surrogate if surrogate_model is None else surrogate_model
+    incident_correlator = correlator if incident_correlator is None else incident_correlator
     graph = StateGraph(CyberState)
 
+    graph.add_node("surrogate", lambda state: surrogate_gate(state, surrogate_model))
     graph.add_node("event_processing", event_processing_agent)
     graph.add_node("threat_intel", threat_intelligence_agent)
-    graph.add_node("decision", response_decision_agent)
-    graph.add_node("enforce", enforcement_agent)
-    graph.add_node("audit", audit_learning_agent)
-
-    graph.add_edge(START, "event_processing")
+    graph.add_node("correlate", lambda state: incident_correlation(state, incident_correlator))
+    graph.add_node("decision", release_incident_on_failure(response_decision_agent, incident_correlator))
+    graph.add_node("enforce", release_incident_on_failure(enforcement_agent, incident_correlator))
+    graph.add_node("audit", release_incident_on_failure(
+        lambda state: audit_learning_agent(state, surrogate_model, incident_correlator), incident_correlator))
+
+    graph.add_edge(START, "surrogate")
+    graph.add_conditional_edges("surrogate", route_after_gate, ["event_processing", "correlate"])
     graph.add_edge("event_processing", "threat_intel")
-    graph.add_edge("threat_intel", "decision")
+    graph.add_edge("threat_intel", "correlate")
+    graph.add_conditional_edges("correlate", route_after_correlation, ["decision", "audit"])
     graph.add_edge("decision", "enforce")
     graph.add_edge("enforce", "audit")
     graph.add_edge("audit", END)
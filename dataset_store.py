@@ -0,0 +1,261 @@
+"""
+Columnar CIC-IDS2018 store
+File: dataset_store.py
+
+Converts the CSV dataset once into Parquet (or Feather) with proper numeric
+dtypes, inf/NaN cleaned and rows sorted so that row-group statistics allow
+predicate pushdown. Later runs load only the needed columns and row groups,
+memory-mapped, instead of re-parsing ~80 columns of CSV text.
+
+The conversion streams the CSV in chunks (--chunk-rows, default 500k) via
+per-Label spill files in a temporary directory, so it needs memory for a
+few chunks, not for the whole dataset, plus temporary disk about the size
+of the output.
+
+Both formats are written uncompressed by default. Feather is then truly
+zero-copy (Arrow buffers are used straight from the mapped file). Parquet
+still decodes its pages, but skips decompression and keeps row-group
+pushdown; pass --compression zstd to trade load speed for disk space.
+
+Convert:
+    python3 dataset_store.py cis-ids2018.csv cis-ids2018.parquet
+    python3 dataset_store.py cis-ids2018.csv cis-ids2018.feather
+
+Load (filters use pyarrow's DNF tuples):
+    df = load_flows("cis-ids2018.parquet", filters=[("Dst Port", "in", [21, 22])])
+    df = load_flows("cis-ids2018.parquet", filters=[("Label", "==", "FTP-BruteForce")])
+"""
+
+from typing import Dict, List, Optional, Sequence
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# non-numeric columns; everything else is coerced to a number
+TEXT_COLUMNS = ["Flow ID", "Src IP", "Dst IP", "Label"]
+TIMESTAMP_COLUMN = "Timestamp"
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+DEFAULT_SORT = ("Label", "Timestamp")
+DEFAULT_ROW_GROUP_SIZE = 64_000
+DEFAULT_COMPRESSION = "none"
+DEFAULT_CHUNK_ROWS = 500_000
+
+FEATHER_SUFFIXES = (".feather", ".arrow")
+PARQUET_CODECS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+FEATHER_CODECS = ("none", "lz4", "zstd")
+
+
+# -----------------------------
+# Cleaning
+# -----------------------------
+def check_compression(out_path: str, compression: str) -> None:
+    """Raise ValueError if `compression` is not supported by the output format."""
+    codecs = FEATHER_CODECS if out_path.endswith(FEATHER_SUFFIXES) else PARQUET_CODECS
+    if compression not in codecs:
+        raise ValueError(f"Compression {compression!r} not supported for {out_path}; use one of {', '.join(codecs)}")
+
+
+def clean_flows(df: pd.DataFrame, downcast_ints: bool = True) -> pd.DataFrame:
+    """
+    Give every column a proper dtype: numeric features as int64/float64
+    (inf and NaN replaced with 0), Timestamp as datetime, Label as category.
+    Repeated header rows (present in some merged CIC CSVs) are dropped.
+    With downcast_ints=False numeric columns stay float64 (used for chunks,
+    where one chunk being integral says nothing about the next).
+    """
+    df.columns = [c.strip() for c in df.columns]
+    if "Label" in df.columns:
+        df = df[df["Label"] != "Label"].copy()
+
+    for col in df.columns:
+        if col == TIMESTAMP_COLUMN:
+            df[col] = pd.to_datetime(df[col], format=TIMESTAMP_FORMAT, errors="coerce")
+        elif col in TEXT_COLUMNS:
+            df[col] = df[col].astype(str)
+        else:
+            values = pd.to_numeric(df[col], errors="coerce").replace([np.inf, -np.inf], np.nan).fillna(0)
+            if not downcast_ints:
+                values = values.astype(np.float64)
+            elif (values == values.round()).all() and values.abs().max() < 2 ** 62:
+                values = values.astype(np.int64)
+            df[col] = values
+
+    if "Label" in df.columns:
+        df["Label"] = df["Label"].astype("category")
+    return df.reset_index(drop=True)
+
+
+# -----------------------------
+# Conversion
+# -----------------------------
+def _integral_columns(df: pd.DataFrame) -> set:
+    return {
+        col for col in df.columns
+        if col not in TEXT_COLUMNS and col != TIMESTAMP_COLUMN
+        and (df[col] == df[col].round()).all() and df[col].abs().max() < 2 ** 62
+    }
+
+
+def _output_writer(out_path: str, schema: pa.Schema, compression: str):
+    if out_path.endswith(FEATHER_SUFFIXES):
+        # Feather V2 is the Arrow IPC file format
+        options = pa.ipc.IpcWriteOptions(compression=None if compression == "none" else compression)
+        return pa.ipc.new_file(out_path, schema, options=options)
+    return pq.ParquetWriter(out_path, schema, compression=compression)
+
+
+def convert_csv(
+    csv_path: str,
+    out_path: str,
+    sort_by: Sequence[str] = DEFAULT_SORT,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> str:
+    """
+    One-time conversion of the CIC-IDS2018 CSV to Parquet or Feather
+    (chosen by the extension of out_path), streamed so memory stays at a
+    few `chunk_rows` chunks regardless of dataset size.
+
+    Pass 1 reads the CSV in chunks, cleans each one and spills it, sorted by
+    `sort_by` within the chunk, into one temporary Parquet file per Label.
+    Pass 2 writes the labels in order, so each row group holds one Label and
+    a narrow Timestamp range; filters on those columns skip whole groups.
+    Timestamp order inside a label is global when the CSV is chronological
+    (as the CIC-IDS2018 day files are), otherwise it holds per chunk.
+    Columns whose values are all integral are written as int64.
+
+    With compression="none" (default) memory-mapped loads skip decompression;
+    for Feather this makes them zero-copy.
+    """
+    check_compression(out_path, compression)
+    start = time.perf_counter()
+    rows = 0
+    integral: Optional[set] = None
+
+    with tempfile.TemporaryDirectory(prefix="cicids_spill_") as spill_dir:
+        spills: Dict[str, pq.ParquetWriter] = {}
+        spill_schema: Optional[pa.Schema] = None
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, low_memory=False):
+                chunk = clean_flows(chunk, downcast_ints=False)
+                if "Label" not in chunk.columns:
+                    chunk["Label"] = ""
+                chunk["Label"] = chunk["Label"].astype(str)
+                keys = [c for c in sort_by if c in chunk.columns]
+                if keys:
+                    chunk = chunk.sort_values(keys, kind="stable")
+
+                chunk_integral = _integral_columns(chunk)
+                integral = chunk_integral if integral is None else integral & chunk_integral
+                rows += len(chunk)
+
+                for label, group in chunk.groupby("Label", sort=False):
+                    table = pa.Table.from_pandas(group, preserve_index=False)
+                    if spill_schema is None:
+                        spill_schema = table.schema.remove_metadata()
+                    table = table.cast(spill_schema)
+                    if label not in spills:
+                        spills[label] = pq.ParquetWriter(
+                            os.path.join(spill_dir, f"label_{len(spills)}.parquet"), spill_schema)
+                    spills[label].write_table(table)
+        finally:
+            for writer in spills.values():
+                writer.close()
+
+        if spill_schema is None:
+            raise ValueError(f"{csv_path} contains no rows")
+
+        schema = pa.schema([
+            pa.field(f.name, pa.int64()) if f.name in integral else f
+            for f in spill_schema
+        ])
+        label_order = sorted(spills) if "Label" in sort_by else list(spills)
+        with _output_writer(out_path, schema, compression) as writer:
+            for label in label_order:
+                spill = pq.ParquetFile(spills[label].where)
+                for batch in spill.iter_batches(batch_size=row_group_size):
+                    table = pa.Table.from_batches([batch]).cast(schema)
+                    if isinstance(writer, pq.ParquetWriter):
+                        writer.write_table(table, row_group_size=row_group_size)
+                    else:
+                        writer.write_table(table, max_chunksize=row_group_size)
+
+    print(f"✅ Converted {rows} rows to {out_path} in {time.perf_counter() - start:.1f}s")
+    return out_path
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def load_flows(
+    path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[list] = None,
+) -> pd.DataFrame:
+    """
+    Load a converted dataset memory-mapped, reading only `columns` and only
+    rows matching `filters` (pyarrow DNF, e.g. [("Dst Port", "in", [21, 22])]).
+
+    For Parquet the filter is pushed down to row-group statistics, so
+    non-matching row groups are never read. Feather has no row-group
+    statistics: the mapped table is filtered after loading.
+    """
+    expr = pq.filters_to_expression(filters) if filters else None
+
+    if path.endswith(FEATHER_SUFFIXES):
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        if expr is not None:
+            table = table.filter(expr)
+    else:
+        table = pq.read_table(path, columns=columns, filters=expr, memory_map=True)
+
+    return table.to_pandas()
+
+
+def load_dataset(
+    csv_path: str = "cis-ids2018.csv",
+    columnar_path: str = "cis-ids2018.parquet",
+    columns: Optional[List[str]] = None,
+    filters: Optional[list] = None,
+) -> pd.DataFrame:
+    """Use the columnar copy if it exists, otherwise fall back to the CSV."""
+    if os.path.exists(columnar_path):
+        return load_flows(columnar_path, columns=columns, filters=filters)
+
+    print(f"⚠️ {columnar_path} not found, parsing CSV (run dataset_store.py once to convert)")
+    df = clean_flows(pd.read_csv(csv_path, low_memory=False))
+    if filters:
+        df = pa.Table.from_pandas(df, preserve_index=False).filter(pq.filters_to_expression(filters)).to_pandas()
+    if columns:
+        df = df[columns]
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert CIC-IDS2018 CSV to Parquet/Feather")
+    parser.add_argument("csv_path", nargs="?", default="cis-ids2018.csv")
+    parser.add_argument("out_path", nargs="?", default="cis-ids2018.parquet")
+    parser.add_argument("--sort-by", nargs="+", default=list(DEFAULT_SORT))
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument("--compression", default=DEFAULT_COMPRESSION,
+                        help="none (default, fastest load); Parquet also: snappy, gzip, brotli, lz4, zstd; "
+                             "Feather also: lz4, zstd")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="CSV rows held in memory at a time")
+    args = parser.parse_args()
+
+    try:
+        check_compression(args.out_path, args.compression)
+    except ValueError as e:
+        parser.error(str(e))
+    convert_csv(args.csv_path, args.out_path, sort_by=args.sort_by, row_group_size=args.row_group_size,
+                compression=args.compression, chunk_rows=args.chunk_rows)
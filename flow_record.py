@@ -0,0 +1,111 @@
+"""
+Compact flow representation
+File: flow_record.py
+
+Instead of turning every DataFrame row into an ~80-entry dict
+(`iterrows()` + `to_dict()`), a FlowBatch keeps the dataset as one NumPy
+array per column, and each flow is a FlowRecord: a two-slot view
+(batch, row index). Values are only boxed when an agent reads them, and the
+row is only serialised to JSON when a prompt actually needs it.
+
+    flows = FlowBatch.from_frame(df, exclude=("Label",))
+    for flow in flows:
+        flow["Dst Port"], flow.get("Protocol"), flow.to_json()
+
+FlowRecord behaves like a read-only Mapping, so code written against the
+old raw_row dicts (row.get(...), row[...], `in`) keeps working.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Sequence
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def _to_python(value: Any) -> Any:
+    # box lazily: NumPy scalars -> plain Python, datetime64 -> pandas Timestamp
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class FlowBatch:
+    """Column-oriented store for many flows: one array per column, no per-row objects."""
+
+    __slots__ = ("columns", "arrays", "index", "length")
+
+    def __init__(self, columns: Sequence[str], arrays: Sequence[np.ndarray]):
+        self.columns = tuple(columns)
+        self.arrays = list(arrays)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.length = len(self.arrays[0]) if self.arrays else 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, exclude: Sequence[str] = ()) -> "FlowBatch":
+        """Build from a DataFrame without copying it row by row; `exclude` drops e.g. Label."""
+        columns = [c for c in df.columns if c not in exclude]
+        return cls(columns, [df[c].to_numpy() for c in columns])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.index
+
+    def __getitem__(self, i: int) -> "FlowRecord":
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        return FlowRecord(self, i)
+
+    def __iter__(self) -> Iterator["FlowRecord"]:
+        for i in range(self.length):
+            yield FlowRecord(self, i)
+
+
+class FlowRecord(Mapping):
+    """
+    One flow, as a view into a FlowBatch. Read-only Mapping of column -> value.
+    Pickles as just this row's values, never the whole batch.
+    """
+
+    __slots__ = ("batch", "row")
+
+    def __init__(self, batch: FlowBatch, row: int):
+        self.batch = batch
+        self.row = row
+
+    def __getitem__(self, key: str) -> Any:
+        i = self.batch.index[key]
+        return _to_python(self.batch.arrays[i][self.row])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.batch.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.batch.columns)
+
+    def __len__(self) -> int:
+        return len(self.batch.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {c: _to_python(a[self.row]) for c, a in zip(self.batch.columns, self.batch.arrays)}
+
+    def to_json(self, indent: int = 2) -> str:
+        """Serialise for a prompt; only called by agents that put the raw row in front of the LLM."""
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    def __repr__(self) -> str:
+        return f"FlowRecord(row={self.row}, columns={len(self)})"
+
+    def __reduce__(self):
+        return _rebuild_record, (self.batch.columns, [a[self.row] for a in self.batch.arrays])
+
+
+def _rebuild_record(columns: Sequence[str], values: List[Any]) -> FlowRecord:
+    return FlowRecord(FlowBatch(columns, [np.asarray([v]) for v in values]), 0)
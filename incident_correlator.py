@@ -0,0 +1,195 @@
+"""
+Incident correlation between threat analysis and response decision
+File: incident_correlator.py
+
+Malicious verdicts are grouped by (source, target, attack_type) within a
+sliding time window of flow timestamps. Only the first flow of an incident, and flows that
+escalate it (flow count reaching the next power of `escalation_factor`),
+go through the ResponseDecisionAgent and EnforcementAgent; every other flow
+reuses the incident's decision. LLM cost downstream of threat analysis then
+follows the number of incidents, not the number of flows.
+
+If an incident's first decision fails, `abandon` releases the flows waiting
+for it and closes the incident, so the next flow opens a new one and the
+decision is retried.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+import itertools
+import threading
+import time
+
+import pandas as pd
+
+from surrogate_model import verdict_class
+
+NEW = "new"
+ESCALATED = "escalated"
+ONGOING = "ongoing"
+
+
+class Incident:
+    __slots__ = (
+        "incident_id", "key", "first_seen", "last_seen", "flow_count",
+        "max_confidence", "level", "response_decision", "enforcement_result", "decided",
+    )
+
+    def __init__(self, incident_id: str, key: Tuple[str, str, str], seen: float):
+        self.incident_id = incident_id
+        self.key = key
+        self.first_seen = seen
+        self.last_seen = seen
+        self.flow_count = 0
+        self.max_confidence = 0.0
+        self.level = 0
+        self.response_decision: Optional[Dict[str, Any]] = None
+        self.enforcement_result: Optional[Dict[str, Any]] = None
+        self.decided = threading.Event()  # set once the first decision is recorded
+
+    def summary(self, status: str) -> Dict[str, Any]:
+        source, target, attack_type = self.key
+        return {
+            "incident_id": self.incident_id,
+            "status": status,
+            "source": source,
+            "target": target,
+            "attack_type": attack_type,
+            "flow_count": self.flow_count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "max_confidence": self.max_confidence,
+        }
+
+
+def _flow_time(row: Mapping[str, Any]) -> float:
+    ts = row.get("Timestamp")
+    if ts is pd.NaT:  # a datetime subclass whose .timestamp() raises
+        return time.time()
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, str):
+        try:
+            return datetime.strptime(ts, "%d/%m/%Y %H:%M:%S").timestamp()
+        except ValueError:
+            pass
+    if hasattr(ts, "timestamp"):  # pandas Timestamp
+        return ts.timestamp()
+    return time.time()
+
+
+def incident_key(row: Mapping[str, Any], processed_event: Dict[str, Any], threat_report: Dict[str, Any]) -> Tuple[str, str, str]:
+    """
+    (source, target, attack_type); CIC files without IP columns fall back to
+    the ports. attack_type is normalised like the surrogate's classes, so
+    "FTP-BruteForce" / "ftp_brute_force" / "FTP Brute Force" share an incident.
+    """
+    source = row.get("Src IP") or processed_event.get("source_ip") or "unknown"
+    target = f"{row.get('Dst IP') or processed_event.get('destination_ip') or 'unknown'}:{row.get('Dst Port', '?')}"
+    attack_type = verdict_class(threat_report)
+    return str(source), target, attack_type
+
+
+class IncidentCorrelator:
+    """
+    Args:
+        window_s: an incident stays open while flows keep arriving within this gap
+        escalation_factor: decision re-runs when flow_count reaches factor^level
+    """
+
+    def __init__(self, window_s: float = 300.0, escalation_factor: int = 10):
+        self.window_s = window_s
+        self.escalation_factor = escalation_factor
+        # open incidents by key, least recently seen first (so expiry pops from the front)
+        self.open: "OrderedDict[Tuple[str, str, str], Incident]" = OrderedDict()
+        self.by_id: Dict[str, Incident] = {}
+        self.ids = itertools.count(1)
+        self.total_incidents = 0
+        self.lock = threading.Lock()
+
+    def _close(self, key: Tuple[str, str, str]) -> None:
+        incident = self.open.pop(key)
+        del self.by_id[incident.incident_id]
+
+    def _expire(self, now: float) -> None:
+        while self.open:
+            key, incident = next(iter(self.open.items()))
+            if now - incident.last_seen <= self.window_s:
+                break
+            self._close(key)
+
+    def correlate(self, row: Mapping[str, Any], processed_event: Dict[str, Any], threat_report: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach one malicious flow to an incident; returns the incident summary with its status."""
+        key = incident_key(row, processed_event, threat_report)
+        seen = _flow_time(row)
+        try:
+            confidence = float(threat_report.get("confidence", 0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+
+        with self.lock:
+            self._expire(seen)
+            incident = self.open.get(key)
+            # expiry stops at the first fresh incident, so with out-of-order
+            # timestamps a stale one can still be open here
+            if incident is not None and seen - incident.last_seen > self.window_s:
+                self._close(key)
+                incident = None
+            status = ONGOING
+            if incident is None:
+                incident = Incident(f"INC-{next(self.ids):06d}", key, seen)
+                self.open[key] = incident
+                self.by_id[incident.incident_id] = incident
+                self.total_incidents += 1
+                status = NEW
+            else:
+                self.open.move_to_end(key)
+
+            incident.flow_count += 1
+            incident.last_seen = max(incident.last_seen, seen)
+            incident.max_confidence = max(incident.max_confidence, confidence)
+            if status == ONGOING and incident.flow_count >= self.escalation_factor ** (incident.level + 1):
+                incident.level += 1
+                status = ESCALATED
+            return incident.summary(status)
+
+    def record_response(self, incident_id: str, response_decision: Dict[str, Any], enforcement_result: Dict[str, Any]) -> None:
+        with self.lock:
+            incident = self.by_id.get(incident_id)
+            if incident is not None:
+                incident.response_decision = response_decision
+                incident.enforcement_result = enforcement_result
+                incident.decided.set()
+
+    def abandon(self, incident_id: str, reason: str) -> None:
+        """
+        The decision for an incident failed. Flows waiting for its first
+        decision get an "undecided" marker instead of waiting out their
+        timeout, and the incident is closed so the next flow retries.
+        An incident that already has a decision keeps it.
+        """
+        with self.lock:
+            incident = self.by_id.get(incident_id)
+            if incident is not None and not incident.decided.is_set():
+                incident.response_decision = {
+                    "response": "undecided",
+                    "justification": f"Decision for {incident_id} failed: {reason}",
+                }
+                incident.enforcement_result = {"action": "none", "target": incident.key[0], "status": "abandoned"}
+                incident.decided.set()
+                if self.open.get(incident.key) is incident:
+                    self._close(incident.key)
+
+    def cached_response(self, incident_id: str, timeout: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Decision and enforcement of an incident. If the first decision is
+        still in flight, wait up to `timeout` seconds for it; returns
+        (None, None) if it does not arrive in time.
+        """
+        with self.lock:
+            incident = self.by_id.get(incident_id)
+        if incident is None or not incident.decided.wait(timeout):
+            return None, None
+        with self.lock:
+            return incident.response_decision, incident.enforcement_result
@@ -0,0 +1,357 @@
+"""
+Pooled multi-endpoint LLM transport
+File: llm_transport.py
+
+Sits between the agents and the OpenAI-compatible APIs:
+1. One shared HTTP connection pool for every endpoint and worker thread
+2. Weighted load balancing across several endpoints (keys / local servers)
+3. Token-bucket limiters per endpoint for RPM and TPM quotas
+4. Jittered exponential backoff on 429 / 5xx / timeouts / bad JSON
+5. JSON-mode requests plus local repair of slightly malformed replies
+
+Endpoints are read from the LLM_ENDPOINTS env var, either inline JSON or a
+path to a JSON file:
+
+    LLM_ENDPOINTS='[
+        {"name": "openai-a", "api_key_env": "OPENAI_API_KEY", "rpm": 500, "tpm": 200000, "weight": 2},
+        {"name": "local", "base_url": "http://127.0.0.1:8000/v1", "api_key": "stub", "weight": 1}
+    ]'
+
+Without LLM_ENDPOINTS a single endpoint is built from OPENAI_API_KEY, so the
+original .env setup keeps working. Pointing base_url at a local stub server
+is enough to run the whole pipeline offline.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+# -----------------------------
+# Endpoint configuration
+# -----------------------------
+@dataclass
+class Endpoint:
+    name: str
+    api_key: str
+    base_url: Optional[str] = None  # None -> api.openai.com
+    model: str = DEFAULT_MODEL
+    weight: float = 1.0
+    rpm: Optional[int] = None  # requests per minute quota
+    tpm: Optional[int] = None  # tokens per minute quota
+    json_mode: bool = True  # send response_format={"type": "json_object"}
+    max_tokens: Optional[int] = None  # output cap sent to the API; None = no cap
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any], index: int = 0) -> "Endpoint":
+        api_key = cfg.get("api_key")
+        if api_key is None and cfg.get("api_key_env"):
+            api_key = os.getenv(cfg["api_key_env"])
+        if not api_key:
+            raise ValueError(f"Missing api key for LLM endpoint #{index} ({cfg.get('name', 'unnamed')})")
+        return cls(
+            name=cfg.get("name", f"endpoint-{index}"),
+            api_key=api_key,
+            base_url=cfg.get("base_url"),
+            model=cfg.get("model", DEFAULT_MODEL),
+            weight=float(cfg.get("weight", 1.0)),
+            rpm=cfg.get("rpm"),
+            tpm=cfg.get("tpm"),
+            json_mode=bool(cfg.get("json_mode", True)),
+            max_tokens=cfg.get("max_tokens"),
+        )
+
+
+def load_endpoints_from_env() -> List[Endpoint]:
+    """
+    Read endpoint list from LLM_ENDPOINTS (inline JSON or file path),
+    falling back to a single OpenAI endpoint using OPENAI_API_KEY.
+    """
+    raw = os.getenv("LLM_ENDPOINTS", "").strip()
+    if raw:
+        if not raw.startswith("["):
+            with open(raw, "r", encoding="utf-8") as f:
+                raw = f.read()
+        configs = json.loads(raw)
+        return [Endpoint.from_dict(cfg, i) for i, cfg in enumerate(configs)]
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("Missing OPENAI_API_KEY in .env")
+    return [Endpoint(
+        name="openai",
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_BASE_URL"),
+        model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+    )]
+
+
+# -----------------------------
+# Token bucket rate limiter
+# -----------------------------
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute / 60` per second.
+    Used for both RPM (1 token per request) and TPM (estimated tokens per request).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # requests larger than the bucket are clamped so they can still go through
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """Correct an earlier estimate: positive delta consumes more, negative refunds."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+# -----------------------------
+# JSON repair
+# -----------------------------
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def parse_json_reply(content: str) -> dict:
+    """
+    Parse an LLM reply as a JSON object, repairing the common failure modes
+    locally (code fences, leading/trailing chatter, trailing commas) instead
+    of spending another API call. Raises ValueError if it cannot be repaired.
+    """
+    text = (content or "").strip()
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    else:
+        if not isinstance(result, dict):
+            raise ValueError(f"LLM returned JSON that is not an object: {content!r}")
+        return result
+
+    text = _FENCE_RE.sub("", text).strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    text = _TRAILING_COMMA_RE.sub(r"\1", text)
+
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"LLM returned invalid JSON: {content!r}") from e
+    if not isinstance(result, dict):
+        raise ValueError(f"LLM returned JSON that is not an object: {content!r}")
+    return result
+
+
+def estimate_tokens(*texts: str) -> int:
+    # ~4 characters per token is close enough for quota accounting
+    return sum(len(t) for t in texts) // 4 + 1
+
+
+# -----------------------------
+# Transport
+# -----------------------------
+class LLMTruncatedError(RuntimeError):
+    """Reply hit the output token cap and cannot be repaired; retrying unchanged would fail the same way."""
+
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class _EndpointState:
+    def __init__(self, endpoint: Endpoint, http_client: httpx.Client):
+        self.endpoint = endpoint
+        self.client = OpenAI(
+            api_key=endpoint.api_key,
+            base_url=endpoint.base_url,
+            http_client=http_client,
+            max_retries=0,  # retries are handled by the transport
+        )
+        self.rpm = TokenBucket(endpoint.rpm) if endpoint.rpm else None
+        self.tpm = TokenBucket(endpoint.tpm) if endpoint.tpm else None
+        self.current_weight = 0.0
+        self.cooldown_until = 0.0
+
+
+class LLMTransport:
+    """
+    Thread-safe, pooled client over one or more OpenAI-compatible endpoints.
+
+    Endpoints are picked with smooth weighted round-robin; endpoints that
+    returned 429 are skipped until their Retry-After cooldown expires.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        output_token_estimate: int = 512,
+        timeout: float = 60.0,
+        max_connections: int = 64,
+    ):
+        if not endpoints:
+            raise ValueError("LLMTransport needs at least one endpoint")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # only used for TPM accounting; the API cap is Endpoint.max_tokens
+        self.output_token_estimate = output_token_estimate
+
+        # single connection pool shared by every endpoint and worker thread
+        self.http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self.states = [_EndpointState(ep, self.http_client) for ep in endpoints]
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "LLMTransport":
+        return cls(load_endpoints_from_env(), **kwargs)
+
+    def close(self) -> None:
+        self.http_client.close()
+
+    # -------------------------
+    # Load balancing
+    # -------------------------
+    def _pick(self) -> _EndpointState:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                ready = [s for s in self.states if s.cooldown_until <= now]
+                if ready:
+                    total = sum(s.endpoint.weight for s in ready)
+                    for s in ready:
+                        s.current_weight += s.endpoint.weight
+                    best = max(ready, key=lambda s: s.current_weight)
+                    best.current_weight -= total
+                    return best
+                wait = min(s.cooldown_until for s in self.states) - now
+            time.sleep(max(wait, 0.0))
+
+    def _cool_down(self, state: _EndpointState, error: Exception) -> None:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        with self.lock:
+            state.cooldown_until = time.monotonic() + (retry_after if retry_after is not None else self.backoff_base)
+
+    def _backoff(self, attempt: int) -> None:
+        # full jitter: uniform(0, min(cap, base * 2^attempt))
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+
+    # -------------------------
+    # Requests
+    # -------------------------
+    def _request(self, state: _EndpointState, system_prompt: str, user_prompt: str, temperature: float) -> dict:
+        ep = state.endpoint
+        estimate = estimate_tokens(system_prompt, user_prompt) + (ep.max_tokens or self.output_token_estimate)
+        if state.rpm:
+            state.rpm.acquire(1)
+        if state.tpm:
+            state.tpm.acquire(estimate)
+
+        kwargs: Dict[str, Any] = {}
+        if ep.json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        if ep.max_tokens:
+            kwargs["max_tokens"] = ep.max_tokens
+
+        response = state.client.chat.completions.create(
+            model=ep.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=temperature,
+            **kwargs,
+        )
+
+        usage = getattr(response, "usage", None)
+        if state.tpm and usage is not None and usage.total_tokens:
+            state.tpm.adjust(usage.total_tokens - estimate)
+
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            try:
+                return parse_json_reply(choice.message.content)
+            except ValueError as e:
+                raise LLMTruncatedError(
+                    f"LLM reply from {ep.name} truncated at max_tokens={ep.max_tokens}"
+                ) from e
+        return parse_json_reply(choice.message.content)
+
+    def chat_json(self, system_prompt: str, user_prompt: str, temperature: float = 0) -> dict:
+        """
+        Send one chat completion and return the reply parsed as a JSON object.
+        Retries on rate limits, transient server errors and unrepairable JSON;
+        a reply truncated by the endpoint's max_tokens raises LLMTruncatedError.
+        """
+        # JSON mode requires the word "JSON" somewhere in the messages
+        if "json" not in (system_prompt + user_prompt).lower():
+            system_prompt = system_prompt + "\nRespond with a JSON object."
+
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            state = self._pick()
+            try:
+                return self._request(state, system_prompt, user_prompt, temperature)
+            except openai.RateLimitError as e:
+                last_error = e
+                self._cool_down(state, e)
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+            except ValueError as e:
+                print(f"⚠️ {e} (attempt {attempt + 1}, endpoint {state.endpoint.name})")
+                last_error = e
+            if attempt < self.max_retries:
+                self._backoff(attempt)
+
+        raise RuntimeError(f"LLM call failed after {self.max_retries + 1} attempts") from last_error
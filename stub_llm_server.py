@@ -0,0 +1,176 @@
+"""
+Local stub of an OpenAI-compatible chat completions endpoint
+File: stub_llm_server.py
+
+Answers POST /v1/chat/completions like the agent that sent the prompt
+(event processing, threat analysis, decision, enforcement), after a
+configurable latency. Used for load tests and offline runs without
+spending API calls.
+
+Run standalone:
+    python3 stub_llm_server.py --port 8000 --latency 0.2
+
+Then point the transport at it:
+    LLM_ENDPOINTS='[{"name": "stub", "base_url": "http://127.0.0.1:8000/v1", "api_key": "stub"}]'
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+# fallback for prompts the stub does not recognise: every key any agent reads
+STUB_REPLY = {
+    "label": "benign",
+    "attack_type": "none",
+    "confidence": 50,
+    "reasoning": "stub LLM reply",
+    "response": "monitor",
+    "justification": "stub LLM reply",
+    "action": "none",
+    "target": "unknown",
+    "mechanism": "SOAR",
+    "detailed action": "stub LLM reply",
+    "status": "simulated",
+}
+
+BRUTE_FORCE_PORTS = {21: "FTP Brute Force", 22: "SSH Brute Force"}
+
+
+def _find_int(pattern: str, text: str):
+    match = re.search(pattern, text)
+    return int(match.group(1)) if match else None
+
+
+def _stub_reply(system: str, user: str) -> dict:
+    """
+    Answer like the agent that sent the prompt, so --stub replays exercise
+    the whole graph. Flows to port 21/22 are reported as brute force, so the
+    correlate -> decision -> enforce path sees malicious traffic.
+    """
+    system = system.lower()
+
+    if "data processing agent" in system:
+        # raw CIC row JSON; return processed features only (never a label)
+        return {
+            "destination_port": _find_int(r'"Dst Port":\s*(\d+)', user),
+            "protocol": _find_int(r'"Protocol":\s*(\d+)', user),
+            "flow_duration": _find_int(r'"Flow Duration":\s*(\d+)', user),
+        }
+
+    if "soc analyst" in system:
+        # only the observed event, not the few-shot examples before it
+        observed = user.split("Observed event:", 1)[-1]
+        attack = BRUTE_FORCE_PORTS.get(_find_int(r'"destination_port":\s*(\d+)', observed))
+        if attack:
+            return {"label": "malicious", "attack_type": attack, "confidence": 90,
+                    "reasoning": "stub: brute-force port"}
+        return {"label": "benign", "attack_type": "none", "confidence": 60, "reasoning": "stub: benign"}
+
+    if "response decision agent" in system:
+        malicious = '"label": "malicious"' in user
+        return {"response": "block" if malicious else "monitor", "justification": "stub decision"}
+
+    if "enforcement" in system:
+        block = '"response": "block"' in user
+        return {"action": "block_ip" if block else "none", "target": "unknown", "mechanism": "firewall",
+                "detailed action": "stub enforcement", "status": "simulated"}
+
+    return dict(STUB_REPLY)
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0  # share of requests answered with 429
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if self.error_rate and random.random() < self.error_rate:
+            self._send(429, {"error": {"message": "stub rate limit", "type": "rate_limit_error"}},
+                       {"Retry-After": "0.1"})
+            return
+
+        messages = body.get("messages", [])
+        system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+        prompt = system + user
+        content = json.dumps(_stub_reply(system, user))
+        self._send(200, {
+            "id": "stub-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        })
+
+    def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub in a background thread. port=0 picks a free port.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of replies that are 429")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"🧪 Stub LLM listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
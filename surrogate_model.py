@@ -0,0 +1,330 @@
+"""
+Learned surrogate classifier distilled from LLM verdicts
+File: surrogate_model.py
+
+The AuditLearningAgent feeds every LLM verdict (label / attack type /
+confidence) into this model together with a deterministic feature vector
+built from the raw CIC-IDS2018 row. The model is a NumPy softmax regression
+trained online (Adagrad partial fit), so no extra ML dependency is needed.
+
+Flows are grouped into regions (protocol + destination port bucket). For
+every LLM-labelled flow the model first predicts, then trains, so each
+region keeps a running agreement rate with the LLM. Once a region agrees
+above the threshold, the surrogate answers for it instead of the LLM, with
+a fraction of flows still spot-checked by the LLM to catch drift.
+
+Models are versioned on disk as models/surrogate_v<N>.npz.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import glob
+import json
+import math
+import os
+import random
+import re
+import threading
+
+import numpy as np
+
+
+# -----------------------------
+# Deterministic feature set
+# -----------------------------
+# CIC-IDS2018 columns, log-scaled (sign preserved); missing / inf / NaN -> 0
+NUMERIC_FEATURES = [
+    "Flow Duration",
+    "Tot Fwd Pkts",
+    "Tot Bwd Pkts",
+    "TotLen Fwd Pkts",
+    "TotLen Bwd Pkts",
+    "Fwd Pkt Len Max",
+    "Bwd Pkt Len Max",
+    "Flow Byts/s",
+    "Flow Pkts/s",
+    "Flow IAT Mean",
+    "Pkt Len Mean",
+    "Init Fwd Win Byts",
+    "Init Bwd Win Byts",
+    "Idle Max",
+]
+FLAG_FEATURES = [
+    "FIN Flag Cnt",
+    "SYN Flag Cnt",
+    "RST Flag Cnt",
+    "PSH Flag Cnt",
+    "ACK Flag Cnt",
+]
+KNOWN_PORTS = [21, 22, 23, 25, 53, 80, 139, 443, 445, 3389, 8080]
+PROTOCOLS = [0, 6, 17]
+
+FEATURE_NAMES = (
+    [f"log_{c}" for c in NUMERIC_FEATURES]
+    + FLAG_FEATURES
+    + [f"port_{p}" for p in KNOWN_PORTS]
+    + ["port_ephemeral", "port_other"]
+    + [f"proto_{p}" for p in PROTOCOLS]
+    + ["bias"]
+)
+
+
+def _num(row: Mapping[str, Any], key: str) -> float:
+    try:
+        x = float(row.get(key, 0))
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(x) or math.isinf(x):
+        return 0.0
+    return x
+
+
+def _port_bucket(port: int) -> str:
+    if port in KNOWN_PORTS:
+        return str(port)
+    if port >= 49152:
+        return "ephemeral"
+    return "other"
+
+
+def region_of(row: Mapping[str, Any]) -> str:
+    """Region key used for per-region agreement tracking, e.g. '6/22'."""
+    return f"{int(_num(row, 'Protocol'))}/{_port_bucket(int(_num(row, 'Dst Port')))}"
+
+
+def extract_features(row: Mapping[str, Any]) -> np.ndarray:
+    """Deterministic feature vector for one raw CIC-IDS2018 row."""
+    vec = [math.copysign(math.log1p(abs(_num(row, c))), _num(row, c)) for c in NUMERIC_FEATURES]
+    vec += [1.0 if _num(row, c) > 0 else 0.0 for c in FLAG_FEATURES]
+
+    bucket = _port_bucket(int(_num(row, "Dst Port")))
+    vec += [1.0 if bucket == str(p) else 0.0 for p in KNOWN_PORTS]
+    vec += [1.0 if bucket == "ephemeral" else 0.0, 1.0 if bucket == "other" else 0.0]
+
+    proto = int(_num(row, "Protocol"))
+    vec += [1.0 if proto == p else 0.0 for p in PROTOCOLS]
+    vec.append(1.0)
+    return np.asarray(vec, dtype=np.float64)
+
+
+def verdict_class(threat_report: Dict[str, Any]) -> str:
+    """Collapse an LLM threat report into one class: 'benign' or the attack type."""
+    if str(threat_report.get("label", "")).strip().lower() == "benign":
+        return "benign"
+    attack = str(threat_report.get("attack_type", "") or "").strip()
+    # "FTP-BruteForce", "ftp_brute_force", "SSH-Bruteforce" -> "ftp brute force", "ssh brute force"
+    attack = re.sub(r"(?<=[a-z])(?=[A-Z][a-z])", " ", attack).lower()
+    attack = re.sub(r"[\s_-]+", " ", attack).replace("bruteforce", "brute force")
+    if not attack or attack in ("none", "n/a", "unknown", "..."):
+        return "malicious"
+    return attack
+
+
+def _versioned_paths(model_dir: str) -> Dict[int, str]:
+    """version -> path for files named exactly surrogate_v<N>.npz."""
+    versions = {}
+    for path in glob.glob(os.path.join(model_dir, "surrogate_v*.npz")):
+        match = re.fullmatch(r"surrogate_v(\d+)\.npz", os.path.basename(path))
+        if match:
+            versions[int(match.group(1))] = path
+    return versions
+
+
+# -----------------------------
+# Surrogate model
+# -----------------------------
+class SurrogateClassifier:
+    """
+    Online softmax regression over FEATURE_NAMES with per-region agreement
+    tracking against the LLM.
+
+    Args:
+        model_dir: where versioned snapshots are written
+        agreement_threshold: region agreement (EMA) needed before taking over
+        min_region_samples: LLM-labelled flows a region needs before taking over
+        min_confidence: model probability needed to answer a single flow
+        spot_check_rate: fraction of taken-over flows still sent to the LLM
+        save_every: write a new version after this many training updates
+        keep_versions: number of most recent versions kept on disk (0 keeps all)
+    """
+
+    def __init__(
+        self,
+        model_dir: str = "models",
+        agreement_threshold: float = 0.95,
+        min_region_samples: int = 50,
+        min_confidence: float = 0.9,
+        spot_check_rate: float = 0.05,
+        save_every: int = 200,
+        keep_versions: int = 5,
+        learning_rate: float = 0.1,
+        l2: float = 1e-4,
+        agreement_alpha: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        self.model_dir = model_dir
+        self.agreement_threshold = agreement_threshold
+        self.min_region_samples = min_region_samples
+        self.min_confidence = min_confidence
+        self.spot_check_rate = spot_check_rate
+        self.save_every = save_every
+        self.keep_versions = keep_versions
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.agreement_alpha = agreement_alpha
+        self.rng = random.Random(seed)
+
+        n = len(FEATURE_NAMES)
+        self.classes: List[str] = []
+        self.weights = np.zeros((0, n))
+        self.grad_sq = np.zeros((0, n))
+        # region -> {"n": LLM-labelled flows, "agreement": EMA of surrogate == LLM}
+        self.regions: Dict[str, Dict[str, float]] = {}
+        self.version = 0
+        self.updates = 0
+        self.saved_updates = 0  # `updates` at the last save/load
+        self.lock = threading.Lock()
+
+    # -------------------------
+    # Prediction
+    # -------------------------
+    def _probs(self, x: np.ndarray) -> np.ndarray:
+        z = self.weights @ x
+        z -= z.max()
+        e = np.exp(z)
+        return e / e.sum()
+
+    def predict(self, row: Mapping[str, Any]) -> Optional[Tuple[str, float]]:
+        """Return (class, probability), or None before anything has been learned."""
+        with self.lock:
+            if len(self.classes) < 2:
+                return None
+            p = self._probs(extract_features(row))
+            i = int(np.argmax(p))
+            return self.classes[i], float(p[i])
+
+    def region_trusted(self, region: str) -> bool:
+        stats = self.regions.get(region)
+        return (
+            stats is not None
+            and stats["n"] >= self.min_region_samples
+            and stats["agreement"] >= self.agreement_threshold
+        )
+
+    def route(self, row: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Decide whether the surrogate answers this flow.
+
+        Returns {"use_surrogate": bool, "prediction": (cls, prob) | None,
+        "region": str, "spot_check": bool}.
+        """
+        region = region_of(row)
+        prediction = self.predict(row)
+        confident = (
+            prediction is not None
+            and prediction[1] >= self.min_confidence
+            and self.region_trusted(region)
+        )
+        spot_check = confident and self.rng.random() < self.spot_check_rate
+        return {
+            "use_surrogate": confident and not spot_check,
+            "prediction": prediction,
+            "region": region,
+            "spot_check": spot_check,
+        }
+
+    # -------------------------
+    # Training
+    # -------------------------
+    def _class_index(self, cls: str) -> int:
+        if cls not in self.classes:
+            self.classes.append(cls)
+            n = len(FEATURE_NAMES)
+            self.weights = np.vstack([self.weights, np.zeros((1, n))])
+            self.grad_sq = np.vstack([self.grad_sq, np.zeros((1, n))])
+        return self.classes.index(cls)
+
+    def observe(self, row: Mapping[str, Any], threat_report: Dict[str, Any]) -> None:
+        """
+        Record one LLM verdict: update region agreement (prequential, i.e.
+        predict before training) and take one Adagrad step weighted by the
+        LLM confidence.
+        """
+        target = verdict_class(threat_report)
+        try:
+            weight = min(max(float(threat_report.get("confidence", 100)) / 100.0, 0.05), 1.0)
+        except (TypeError, ValueError):
+            weight = 1.0
+
+        x = extract_features(row)
+        region = region_of(row)
+
+        with self.lock:
+            if len(self.classes) >= 2:
+                predicted = self.classes[int(np.argmax(self._probs(x)))]
+                agreed = 1.0 if predicted == target else 0.0
+                stats = self.regions.setdefault(region, {"n": 0, "agreement": 0.0})
+                stats["agreement"] += self.agreement_alpha * (agreed - stats["agreement"])
+                stats["n"] += 1
+
+            k = self._class_index(target)
+            y = np.zeros(len(self.classes))
+            y[k] = 1.0
+            grad = weight * np.outer(self._probs(x) - y, x) + self.l2 * self.weights
+            self.grad_sq += grad * grad
+            self.weights -= self.learning_rate * grad / (np.sqrt(self.grad_sq) + 1e-8)
+            self.updates += 1
+            should_save = self.save_every and self.updates % self.save_every == 0
+
+        if should_save:
+            self.save()
+
+    # -------------------------
+    # Versioned persistence
+    # -------------------------
+    @property
+    def has_unsaved_updates(self) -> bool:
+        return self.updates != self.saved_updates
+
+    def save(self) -> str:
+        """Write the next version and delete all but the newest `keep_versions`."""
+        with self.lock:
+            os.makedirs(self.model_dir, exist_ok=True)
+            existing = _versioned_paths(self.model_dir)
+            self.version = max([self.version] + list(existing)) + 1
+            path = os.path.join(self.model_dir, f"surrogate_v{self.version}.npz")
+            meta = {
+                "version": self.version,
+                "updates": self.updates,
+                "classes": self.classes,
+                "feature_names": FEATURE_NAMES,
+                "regions": self.regions,
+            }
+            np.savez(path, weights=self.weights, grad_sq=self.grad_sq, meta=json.dumps(meta))
+            self.saved_updates = self.updates
+
+            existing[self.version] = path
+            for version in sorted(existing)[:-self.keep_versions]:
+                os.remove(existing[version])
+        return path
+
+    @classmethod
+    def load_latest(cls, model_dir: str = "models", **kwargs) -> "SurrogateClassifier":
+        """Load the highest saved version, or return a fresh model if none exists."""
+        model = cls(model_dir=model_dir, **kwargs)
+        versions = _versioned_paths(model_dir)
+        if not versions:
+            return model
+
+        latest = versions[max(versions)]
+        with np.load(latest) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["feature_names"] != FEATURE_NAMES:
+                print(f"⚠️ Ignoring {latest}: feature set changed")
+                return model
+            model.weights = data["weights"]
+            model.grad_sq = data["grad_sq"]
+        model.classes = meta["classes"]
+        model.regions = meta["regions"]
+        model.version = meta["version"]
+        model.updates = model.saved_updates = meta["updates"]
+        return model
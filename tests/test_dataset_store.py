@@ -0,0 +1,108 @@
+"""
+Tests for dataset_store.py on a tiny generated CIC-IDS2018-style CSV.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import check_compression, clean_flows, convert_csv, load_flows
+
+CSV = """Dst Port,Protocol,Timestamp,Flow Duration,Flow Byts/s,Flow Pkts/s,Label
+22,6,14/02/2018 10:00:02,353159,0,5.66,SSH-Bruteforce
+80,6,14/02/2018 10:00:01,476608,1405.76,Infinity,Benign
+Dst Port,Protocol,Timestamp,Flow Duration,Flow Byts/s,Flow Pkts/s,Label
+21,6,14/02/2018 09:59:59,2,,1000000,FTP-BruteForce
+443,6,not a time,2094,18147.08,1432.66,Benign
+22,6,14/02/2018 10:00:00,353000,-inf,5.67,SSH-Bruteforce
+21,6,14/02/2018 10:00:03,3,0,666666.67,FTP-BruteForce
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "flows.csv"
+    path.write_text(CSV)
+    return str(path)
+
+
+# -----------------------------
+# clean_flows
+# -----------------------------
+def test_clean_flows_types_and_values(csv_path):
+    df = clean_flows(pd.read_csv(csv_path, low_memory=False))
+
+    assert len(df) == 6  # repeated header row dropped
+    assert df["Dst Port"].dtype == np.int64
+    assert df["Flow Duration"].dtype == np.int64
+    assert df["Flow Byts/s"].dtype == np.float64
+    assert isinstance(df["Label"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["Timestamp"])
+
+    # inf / -inf / empty -> 0
+    assert df.loc[df["Flow Pkts/s"].idxmin(), "Flow Pkts/s"] == 0
+    assert (df["Flow Byts/s"] >= 0).all()
+    assert np.isfinite(df.select_dtypes("number").to_numpy()).all()
+
+    # unparseable timestamps become NaT instead of failing
+    assert df["Timestamp"].isna().sum() == 1
+
+
+def test_clean_flows_without_downcast_keeps_floats(csv_path):
+    df = clean_flows(pd.read_csv(csv_path, low_memory=False), downcast_ints=False)
+    assert df["Dst Port"].dtype == np.float64
+
+
+# -----------------------------
+# Conversion + loading
+# -----------------------------
+@pytest.mark.parametrize("suffix", ["parquet", "feather"])
+def test_convert_and_load_with_filters(csv_path, tmp_path, suffix):
+    out = str(tmp_path / f"flows.{suffix}")
+    convert_csv(csv_path, out, row_group_size=2, chunk_rows=2)
+
+    df = load_flows(out)
+    assert len(df) == 6
+    assert df["Dst Port"].dtype == np.int64
+    assert df["Flow Byts/s"].dtype == np.float64
+    # tiny chunks: grouped by Label, Timestamp order only within each chunk
+    assert list(df["Label"]) == sorted(df["Label"])
+
+    ports = load_flows(out, columns=["Dst Port", "Label"], filters=[("Dst Port", "in", [21, 22])])
+    assert list(ports.columns) == ["Dst Port", "Label"]
+    assert sorted(ports["Dst Port"]) == [21, 21, 22, 22]
+
+    ftp = load_flows(out, filters=[("Label", "==", "FTP-BruteForce")])
+    assert set(ftp["Dst Port"]) == {21}
+    assert len(ftp) == 2
+
+
+def test_convert_sorts_by_timestamp_within_chunk(csv_path, tmp_path):
+    out = str(tmp_path / "flows.parquet")
+    convert_csv(csv_path, out)
+    ssh = load_flows(out, filters=[("Label", "==", "SSH-Bruteforce")])
+    assert list(ssh["Flow Duration"]) == [353000, 353159]
+
+
+def test_parquet_row_groups_hold_one_label(csv_path, tmp_path):
+    import pyarrow.parquet as pq
+
+    out = str(tmp_path / "flows.parquet")
+    convert_csv(csv_path, out, row_group_size=2, chunk_rows=2)
+    meta = pq.ParquetFile(out).metadata
+    label_idx = meta.schema.names.index("Label")
+    for i in range(meta.num_row_groups):
+        stats = meta.row_group(i).column(label_idx).statistics
+        assert stats.min == stats.max
+
+
+def test_convert_rejects_unsupported_codec(csv_path, tmp_path):
+    with pytest.raises(ValueError, match="snappy"):
+        convert_csv(csv_path, str(tmp_path / "flows.feather"), compression="snappy")
+
+
+def test_check_compression_per_format():
+    check_compression("x.parquet", "snappy")
+    check_compression("x.feather", "zstd")
+    with pytest.raises(ValueError):
+        check_compression("x.arrow", "gzip")
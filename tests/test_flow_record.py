@@ -0,0 +1,121 @@
+"""
+Tests for flow_record.py: the Mapping view, value boxing, JSON and pickling.
+"""
+
+import json
+import math
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flow_record import FlowBatch, FlowRecord, _to_python
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "Dst Port": np.array([22, 443, 80], dtype=np.int64),
+        "Flow Byts/s": np.array([1.5, np.nan, 3.0]),
+        "Src IP": ["10.0.0.5", "10.0.0.6", "10.0.0.7"],
+        "Timestamp": pd.to_datetime(["2018-02-14 10:00:00", "2018-02-14 10:00:01", "2018-02-14 10:00:02"]),
+        "Label": ["SSH-Bruteforce", "Benign", "Benign"],
+    })
+
+
+@pytest.fixture
+def batch(frame):
+    return FlowBatch.from_frame(frame, exclude=("Label",))
+
+
+# -----------------------------
+# FlowBatch
+# -----------------------------
+def test_batch_excludes_columns(batch):
+    assert len(batch) == 3
+    assert batch.columns == ("Dst Port", "Flow Byts/s", "Src IP", "Timestamp")
+    assert "Dst Port" in batch
+    assert "Label" not in batch
+
+
+def test_batch_indexing(batch):
+    assert batch[0]["Dst Port"] == 22
+    assert batch[-1]["Dst Port"] == 80
+    with pytest.raises(IndexError):
+        batch[3]
+    assert [flow["Dst Port"] for flow in batch] == [22, 443, 80]
+
+
+# -----------------------------
+# Mapping behaviour
+# -----------------------------
+def test_record_is_a_mapping(batch):
+    flow = batch[1]
+
+    assert len(flow) == 4
+    assert list(flow) == ["Dst Port", "Flow Byts/s", "Src IP", "Timestamp"]
+    assert "Src IP" in flow
+    assert "Label" not in flow
+    assert flow["Src IP"] == "10.0.0.6"
+    assert flow.get("Dst Port") == 443
+    assert flow.get("Label") is None
+    assert flow.get("Label", "missing") == "missing"
+    with pytest.raises(KeyError):
+        flow["Label"]
+    assert dict(batch[0]) == batch[0].to_dict()
+
+
+# -----------------------------
+# Boxing
+# -----------------------------
+def test_values_are_plain_python(batch):
+    flow = batch[0]
+
+    assert type(flow["Dst Port"]) is int
+    assert type(flow["Flow Byts/s"]) is float
+    assert flow["Timestamp"] == pd.Timestamp("2018-02-14 10:00:00")
+    assert isinstance(flow["Timestamp"], pd.Timestamp)
+
+
+def test_to_python():
+    assert type(_to_python(np.int32(7))) is int
+    assert type(_to_python(np.float32(0.5))) is float
+    assert type(_to_python(np.bool_(True))) is bool
+    assert _to_python(np.datetime64("2018-02-14T10:00:00")) == pd.Timestamp("2018-02-14 10:00:00")
+    assert _to_python("text") == "text"
+
+
+# -----------------------------
+# JSON
+# -----------------------------
+def test_to_json_handles_nan_and_datetime(batch):
+    data = json.loads(batch[1].to_json())
+
+    assert data["Dst Port"] == 443
+    assert math.isnan(data["Flow Byts/s"])
+    assert data["Timestamp"] == "2018-02-14 10:00:01"
+    assert data["Src IP"] == "10.0.0.6"
+
+
+def test_to_json_indent(batch):
+    assert "\n" not in batch[0].to_json(indent=None)
+    assert "\n" in batch[0].to_json()
+
+
+# -----------------------------
+# Pickling
+# -----------------------------
+def test_pickle_contains_only_that_row(frame):
+    big = pd.concat([frame] * 2000, ignore_index=True)
+    batch = FlowBatch.from_frame(big, exclude=("Label",))
+    flow = batch[1]
+
+    data = pickle.dumps(flow)
+    restored = pickle.loads(data)
+
+    assert len(data) < 1000
+    assert isinstance(restored, FlowRecord)
+    assert len(restored.batch) == 1
+    assert restored.to_json() == flow.to_json()
+    assert restored["Timestamp"] == flow["Timestamp"]
@@ -0,0 +1,183 @@
+"""
+Tests for incident_correlator.py: incident keys, status transitions, window expiry and decision caching.
+"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from incident_correlator import ESCALATED, NEW, ONGOING, IncidentCorrelator, _flow_time, incident_key
+
+SSH_VERDICT = {"label": "malicious", "attack_type": "SSH-Bruteforce", "confidence": 90}
+DECISION = {"response": "block", "justification": "brute force"}
+ENFORCEMENT = {"action": "block_ip", "target": "10.0.0.5", "status": "simulated"}
+
+
+def flow(seconds, src="10.0.0.5"):
+    return {"Src IP": src, "Dst IP": "172.31.0.2", "Dst Port": 22,
+            "Timestamp": pd.Timestamp("2018-02-14 10:00:00") + pd.Timedelta(seconds=seconds)}
+
+
+def correlate(correlator, seconds, verdict=SSH_VERDICT, **kwargs):
+    return correlator.correlate(flow(seconds, **kwargs), {}, verdict)
+
+
+# -----------------------------
+# incident_key / _flow_time
+# -----------------------------
+@pytest.mark.parametrize("attack_type", ["SSH-Bruteforce", "ssh_brute_force", "SSH Brute Force", "SSH-BruteForce"])
+def test_incident_key_normalises_attack_type(attack_type):
+    key = incident_key(flow(0), {}, {"label": "malicious", "attack_type": attack_type})
+    assert key == ("10.0.0.5", "172.31.0.2:22", "ssh brute force")
+
+
+def test_incident_key_falls_back_to_processed_event():
+    key = incident_key({"Dst Port": 21}, {"source_ip": "1.2.3.4"}, {"label": "malicious", "attack_type": "FTP-BruteForce"})
+    assert key == ("1.2.3.4", "unknown:21", "ftp brute force")
+
+
+def test_flow_time_parses_timestamps_and_survives_nat():
+    ts = pd.Timestamp("2018-02-14 10:00:00")
+    assert _flow_time({"Timestamp": ts}) == ts.timestamp()
+    assert _flow_time({"Timestamp": "14/02/2018 10:00:00"}) == pytest.approx(ts.to_pydatetime().timestamp())
+
+    before = time.time()
+    assert _flow_time({"Timestamp": pd.NaT}) >= before
+    assert _flow_time({}) >= before
+
+
+# -----------------------------
+# Status transitions
+# -----------------------------
+def test_new_ongoing_escalated():
+    correlator = IncidentCorrelator(window_s=300, escalation_factor=3)
+    statuses = [correlate(correlator, i)["status"] for i in range(10)]
+
+    # escalates when flow_count reaches 3 and 9
+    assert statuses == [NEW, ONGOING, ESCALATED, ONGOING, ONGOING, ONGOING, ONGOING, ONGOING, ESCALATED, ONGOING]
+    assert correlator.total_incidents == 1
+
+
+def test_equivalent_attack_types_share_an_incident():
+    correlator = IncidentCorrelator()
+    first = correlate(correlator, 0)
+    second = correlate(correlator, 1, verdict={"label": "malicious", "attack_type": "ssh_brute_force"})
+
+    assert second["status"] == ONGOING
+    assert second["incident_id"] == first["incident_id"]
+
+
+def test_different_sources_get_different_incidents():
+    correlator = IncidentCorrelator()
+    a = correlate(correlator, 0, src="10.0.0.5")
+    b = correlate(correlator, 0, src="10.0.0.6")
+
+    assert a["status"] == b["status"] == NEW
+    assert a["incident_id"] != b["incident_id"]
+
+
+# -----------------------------
+# Window expiry
+# -----------------------------
+def test_incident_expires_after_window():
+    correlator = IncidentCorrelator(window_s=60)
+    first = correlate(correlator, 0)
+    assert correlate(correlator, 50)["status"] == ONGOING
+
+    later = correlate(correlator, 200)
+    assert later["status"] == NEW
+    assert later["incident_id"] != first["incident_id"]
+    assert first["incident_id"] not in correlator.by_id
+
+
+def test_stale_incident_behind_fresh_one_is_not_joined():
+    correlator = IncidentCorrelator(window_s=60)
+    correlate(correlator, 100, src="10.0.0.5")
+    # arrives out of order, so it sits behind a fresher incident in the index
+    stale = correlate(correlator, 0, src="10.0.0.6")
+
+    joined = correlate(correlator, 120, src="10.0.0.6")
+    assert joined["status"] == NEW
+    assert joined["incident_id"] != stale["incident_id"]
+    assert stale["incident_id"] not in correlator.by_id
+
+
+def test_out_of_order_flow_within_window_joins():
+    correlator = IncidentCorrelator(window_s=60)
+    first = correlate(correlator, 100)
+    late = correlate(correlator, 70)
+
+    assert late["status"] == ONGOING
+    assert late["incident_id"] == first["incident_id"]
+    assert late["last_seen"] == first["last_seen"]
+
+
+# -----------------------------
+# Decision caching
+# -----------------------------
+def test_cached_response_after_record():
+    correlator = IncidentCorrelator()
+    incident = correlate(correlator, 0)
+    correlator.record_response(incident["incident_id"], DECISION, ENFORCEMENT)
+
+    assert correlator.cached_response(incident["incident_id"], timeout=0) == (DECISION, ENFORCEMENT)
+
+
+def test_cached_response_times_out():
+    correlator = IncidentCorrelator()
+    incident = correlate(correlator, 0)
+
+    start = time.perf_counter()
+    assert correlator.cached_response(incident["incident_id"], timeout=0.1) == (None, None)
+    assert time.perf_counter() - start >= 0.1
+    assert correlator.cached_response("INC-999999", timeout=0) == (None, None)
+
+
+def test_cached_response_waits_for_in_flight_decision():
+    correlator = IncidentCorrelator()
+    incident = correlate(correlator, 0)
+    correlate(correlator, 1)
+
+    timer = threading.Timer(0.1, correlator.record_response, (incident["incident_id"], DECISION, ENFORCEMENT))
+    timer.start()
+    try:
+        assert correlator.cached_response(incident["incident_id"], timeout=5) == (DECISION, ENFORCEMENT)
+    finally:
+        timer.cancel()
+
+
+def test_abandon_releases_waiters_and_reopens():
+    correlator = IncidentCorrelator()
+    incident = correlate(correlator, 0)
+    correlate(correlator, 1)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(correlator.cached_response(incident["incident_id"], timeout=5)))
+    waiter.start()
+    correlator.abandon(incident["incident_id"], "RuntimeError: LLM down")
+    waiter.join(timeout=1)
+
+    assert not waiter.is_alive()
+    decision, enforcement = results[0]
+    assert decision["response"] == "undecided"
+    assert "LLM down" in decision["justification"]
+    assert enforcement["status"] == "abandoned"
+
+    # the next flow opens a new incident, so the decision is retried
+    retry = correlate(correlator, 2)
+    assert retry["status"] == NEW
+    assert retry["incident_id"] != incident["incident_id"]
+
+
+def test_abandon_keeps_existing_decision():
+    correlator = IncidentCorrelator(escalation_factor=2)
+    incident = correlate(correlator, 0)
+    correlator.record_response(incident["incident_id"], DECISION, ENFORCEMENT)
+    assert correlate(correlator, 1)["status"] == ESCALATED
+
+    correlator.abandon(incident["incident_id"], "escalation decision failed")
+
+    assert correlator.cached_response(incident["incident_id"], timeout=0) == (DECISION, ENFORCEMENT)
+    assert correlate(correlator, 2)["incident_id"] == incident["incident_id"]
@@ -0,0 +1,221 @@
+"""
+Tests for llm_transport.py against a scripted local OpenAI-compatible stub.
+"""
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from llm_transport import (
+    Endpoint,
+    LLMTransport,
+    LLMTruncatedError,
+    TokenBucket,
+    parse_json_reply,
+)
+
+
+# -----------------------------
+# Scripted stub server
+# -----------------------------
+class ScriptedStub:
+    """
+    Replies with the queued (status, content, finish_reason, headers) tuples
+    in order; the last one repeats. Request bodies are kept for inspection.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                stub.requests.append(json.loads(self.rfile.read(length)))
+                status, content, finish_reason, headers = (
+                    stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                )
+                if status == 200:
+                    payload = {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": "stub",
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": finish_reason,
+                        }],
+                    }
+                else:
+                    payload = {"error": {"message": "stub error", "type": "rate_limit_error"}}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+
+
+OK = (200, '{"label": "benign"}', "stop", {})
+RATE_LIMITED = (429, "", None, {"Retry-After": "0.2"})
+
+
+@pytest.fixture
+def make_transport():
+    created = []
+
+    def make(script, **kwargs):
+        stub = ScriptedStub(script)
+        endpoint_kwargs = kwargs.pop("endpoint", {})
+        transport = LLMTransport(
+            [Endpoint(name="stub", api_key="stub", base_url=stub.base_url, **endpoint_kwargs)],
+            backoff_base=0.01,
+            **kwargs,
+        )
+        created.append((stub, transport))
+        return stub, transport
+
+    yield make
+    for stub, transport in created:
+        transport.close()
+        stub.close()
+
+
+# -----------------------------
+# JSON repair
+# -----------------------------
+def test_parse_json_reply_plain():
+    assert parse_json_reply('{"a": 1}') == {"a": 1}
+
+
+def test_parse_json_reply_code_fence():
+    assert parse_json_reply('```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_parse_json_reply_chatter():
+    assert parse_json_reply('Sure, here it is: {"a": 1} Hope this helps.') == {"a": 1}
+
+
+def test_parse_json_reply_trailing_commas():
+    assert parse_json_reply('{"a": [1, 2,], "b": 2,}') == {"a": [1, 2], "b": 2}
+
+
+@pytest.mark.parametrize("content", ['[{"a": 1}]', "42", '"text"', "not json at all", ""])
+def test_parse_json_reply_rejects_non_objects(content):
+    with pytest.raises(ValueError):
+        parse_json_reply(content)
+
+
+# -----------------------------
+# Token bucket
+# -----------------------------
+def test_token_bucket_acquire_waits_for_refill():
+    bucket = TokenBucket(per_minute=600)  # 10 tokens / second
+    bucket.acquire(600)
+    start = time.monotonic()
+    bucket.acquire(2)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_token_bucket_adjust_refunds_and_consumes():
+    bucket = TokenBucket(per_minute=60)  # 1 token / second
+    bucket.acquire(60)
+    bucket.adjust(-10)
+    start = time.monotonic()
+    bucket.acquire(10)
+    assert time.monotonic() - start < 0.1
+
+    bucket.adjust(5)
+    assert bucket.tokens < -4
+
+
+# -----------------------------
+# Load balancing
+# -----------------------------
+def test_weighted_pick_follows_weights():
+    transport = LLMTransport([
+        Endpoint(name="heavy", api_key="x", base_url="http://127.0.0.1:1/v1", weight=3),
+        Endpoint(name="light", api_key="x", base_url="http://127.0.0.1:1/v1", weight=1),
+    ])
+    try:
+        picks = Counter(transport._pick().endpoint.name for _ in range(400))
+    finally:
+        transport.close()
+    assert picks == {"heavy": 300, "light": 100}
+
+
+def test_pick_skips_endpoint_in_cooldown():
+    transport = LLMTransport([
+        Endpoint(name="a", api_key="x", base_url="http://127.0.0.1:1/v1"),
+        Endpoint(name="b", api_key="x", base_url="http://127.0.0.1:1/v1"),
+    ])
+    try:
+        transport.states[0].cooldown_until = time.monotonic() + 60
+        assert {transport._pick().endpoint.name for _ in range(10)} == {"b"}
+    finally:
+        transport.close()
+
+
+# -----------------------------
+# Requests against the stub
+# -----------------------------
+def test_chat_json_sends_json_mode_without_max_tokens(make_transport):
+    stub, transport = make_transport([OK])
+    assert transport.chat_json("system", "user") == {"label": "benign"}
+    body = stub.requests[0]
+    assert body["response_format"] == {"type": "json_object"}
+    assert "max_tokens" not in body
+
+
+def test_chat_json_sends_endpoint_max_tokens(make_transport):
+    stub, transport = make_transport([OK], endpoint={"max_tokens": 256})
+    transport.chat_json("system", "user")
+    assert stub.requests[0]["max_tokens"] == 256
+
+
+def test_429_cools_down_then_succeeds(make_transport):
+    stub, transport = make_transport([RATE_LIMITED, OK])
+    start = time.monotonic()
+    assert transport.chat_json("system", "user") == {"label": "benign"}
+    # the only endpoint was parked for the Retry-After period
+    assert time.monotonic() - start >= 0.2
+    assert len(stub.requests) == 2
+
+
+def test_429_gives_up_after_max_retries(make_transport):
+    stub, transport = make_transport([(429, "", None, {"Retry-After": "0"})], max_retries=2)
+    with pytest.raises(RuntimeError, match="after 3 attempts"):
+        transport.chat_json("system", "user")
+    assert len(stub.requests) == 3
+
+
+def test_invalid_json_is_retried(make_transport):
+    stub, transport = make_transport([(200, "no json here", "stop", {}), OK])
+    assert transport.chat_json("system", "user") == {"label": "benign"}
+    assert len(stub.requests) == 2
+
+
+def test_truncated_reply_is_not_retried(make_transport):
+    stub, transport = make_transport([(200, '{"reasoning": "cut off', "length", {})],
+                                     endpoint={"max_tokens": 5})
+    with pytest.raises(LLMTruncatedError):
+        transport.chat_json("system", "user")
+    assert len(stub.requests) == 1
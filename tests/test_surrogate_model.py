@@ -0,0 +1,165 @@
+"""
+Tests for surrogate_model.py: verdict normalisation, routing and versioned persistence.
+"""
+
+import os
+
+import pytest
+
+from surrogate_model import SurrogateClassifier, region_of, verdict_class
+
+SSH_ROW = {"Dst Port": 22, "Protocol": 6, "Flow Duration": 350000, "Tot Fwd Pkts": 1, "ACK Flag Cnt": 1}
+WEB_ROW = {"Dst Port": 443, "Protocol": 6, "Flow Duration": 4000000, "Tot Fwd Pkts": 12, "Tot Bwd Pkts": 10}
+SSH_VERDICT = {"label": "malicious", "attack_type": "SSH-Bruteforce", "confidence": 95}
+BENIGN_VERDICT = {"label": "benign", "attack_type": "none", "confidence": 90}
+
+
+def make_model(tmp_path, **kwargs):
+    params = dict(
+        model_dir=str(tmp_path),
+        agreement_threshold=0.8,
+        min_region_samples=5,
+        min_confidence=0.6,
+        spot_check_rate=0.0,
+        save_every=0,
+        agreement_alpha=0.5,
+        seed=0,
+    )
+    params.update(kwargs)
+    return SurrogateClassifier(**params)
+
+
+def train(model, rounds):
+    for _ in range(rounds):
+        model.observe(SSH_ROW, SSH_VERDICT)
+        model.observe(WEB_ROW, BENIGN_VERDICT)
+
+
+# -----------------------------
+# verdict_class
+# -----------------------------
+@pytest.mark.parametrize("attack_type", ["FTP-BruteForce", "ftp_brute_force", "FTP Brute Force", "FTP-Bruteforce"])
+def test_verdict_class_normalises_attack_types(attack_type):
+    assert verdict_class({"label": "malicious", "attack_type": attack_type}) == "ftp brute force"
+
+
+def test_verdict_class_keeps_acronyms():
+    assert verdict_class({"label": "malicious", "attack_type": "DoS attacks-Hulk"}) == "dos attacks hulk"
+
+
+def test_verdict_class_benign_and_unknown():
+    assert verdict_class({"label": " Benign ", "attack_type": "SSH Brute Force"}) == "benign"
+    assert verdict_class({"label": "malicious", "attack_type": "none"}) == "malicious"
+    assert verdict_class({"label": "malicious"}) == "malicious"
+
+
+# -----------------------------
+# Routing
+# -----------------------------
+def test_no_prediction_before_two_classes(tmp_path):
+    model = make_model(tmp_path)
+    model.observe(SSH_ROW, SSH_VERDICT)
+    route = model.route(SSH_ROW)
+    assert route["prediction"] is None
+    assert not route["use_surrogate"]
+
+
+def test_no_takeover_before_min_region_samples(tmp_path):
+    model = make_model(tmp_path)
+    train(model, 3)  # regions only start counting once two classes exist
+    assert model.regions[region_of(SSH_ROW)]["n"] < model.min_region_samples
+    assert not model.route(SSH_ROW)["use_surrogate"]
+
+
+def test_no_takeover_below_agreement_threshold(tmp_path):
+    model = make_model(tmp_path, agreement_threshold=1.01)
+    train(model, 30)
+    assert not model.route(SSH_ROW)["use_surrogate"]
+
+
+def test_takeover_after_agreement(tmp_path):
+    model = make_model(tmp_path)
+    train(model, 30)
+    route = model.route(SSH_ROW)
+    assert route["use_surrogate"]
+    assert route["prediction"][0] == "ssh brute force"
+    assert route["region"] == "6/22"
+
+
+def test_spot_check_sends_trusted_flow_to_llm(tmp_path):
+    model = make_model(tmp_path, spot_check_rate=1.0)
+    train(model, 30)
+    route = model.route(SSH_ROW)
+    assert route["spot_check"]
+    assert not route["use_surrogate"]
+
+
+def test_disagreements_revoke_trust(tmp_path):
+    model = make_model(tmp_path)
+    train(model, 30)
+    assert model.route(SSH_ROW)["use_surrogate"]
+
+    # drift: the LLM now calls this traffic benign
+    for _ in range(2):
+        model.observe(SSH_ROW, BENIGN_VERDICT)
+    assert not model.region_trusted(region_of(SSH_ROW))
+    assert not model.route(SSH_ROW)["use_surrogate"]
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def test_save_load_round_trip(tmp_path):
+    model = make_model(tmp_path)
+    train(model, 30)
+    path = model.save()
+    assert os.path.basename(path) == "surrogate_v1.npz"
+    assert not model.has_unsaved_updates
+
+    loaded = SurrogateClassifier.load_latest(str(tmp_path))
+    assert loaded.version == 1
+    assert loaded.classes == model.classes
+    assert loaded.regions == model.regions
+    assert loaded.updates == model.updates
+    assert not loaded.has_unsaved_updates
+    assert loaded.predict(SSH_ROW)[0] == model.predict(SSH_ROW)[0]
+
+
+def test_load_latest_skips_stray_files(tmp_path):
+    model = make_model(tmp_path)
+    train(model, 3)
+    model.save()
+    model.observe(SSH_ROW, SSH_VERDICT)
+    model.save()
+    (tmp_path / "surrogate_v9_old.npz").write_bytes(b"not a model")
+    (tmp_path / "surrogate_vX.npz").write_bytes(b"not a model")
+
+    loaded = SurrogateClassifier.load_latest(str(tmp_path))
+    assert loaded.version == 2
+
+
+def test_load_latest_without_models_returns_fresh(tmp_path):
+    model = SurrogateClassifier.load_latest(str(tmp_path / "missing"))
+    assert model.version == 0
+    assert model.classes == []
+
+
+def test_save_keeps_only_recent_versions(tmp_path):
+    model = make_model(tmp_path, keep_versions=2)
+    train(model, 3)
+    for _ in range(4):
+        model.save()
+    (tmp_path / "notes.txt").write_text("kept")
+    model.save()
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "surrogate_v4.npz", "surrogate_v5.npz"]
+
+
+def test_fresh_model_does_not_overwrite_existing_versions(tmp_path):
+    first = make_model(tmp_path)
+    train(first, 3)
+    first.save()
+    first.save()
+
+    second = make_model(tmp_path)
+    train(second, 3)
+    assert os.path.basename(second.save()) == "surrogate_v3.npz"
@@ -0,0 +1,92 @@
+"""
+Tests for traffic_replay.py: saturation detection and run summaries.
+"""
+
+import pytest
+
+from traffic_replay import ReplayResult, find_saturation, summarise
+
+
+def make_samples(queue_depths, offered_per_window=20, interval=0.5):
+    """(t, queue depth, offered so far, processed so far) with processed = offered - queue."""
+    samples = []
+    for i, depth in enumerate(queue_depths):
+        offered = i * offered_per_window
+        samples.append((round(i * interval, 3), depth, offered, offered - depth))
+    return samples
+
+
+# -----------------------------
+# find_saturation
+# -----------------------------
+def test_keeping_up_is_not_saturated():
+    assert find_saturation(make_samples([0] * 40)) is None
+
+
+def test_single_burst_that_drains_is_not_saturated():
+    # one second of CIC timestamps arriving at once, then drained
+    depths = [0] * 10 + [15, 30, 15, 5, 0] + [0] * 20
+    assert find_saturation(make_samples(depths)) is None
+
+
+def test_short_growth_is_not_saturated():
+    # grows for one span only, then plateaus
+    depths = [0] * 5 + [i * 3 for i in range(1, 8)] + [21] * 20
+    assert find_saturation(make_samples(depths)) is None
+
+
+def test_sustained_growth_is_saturated():
+    depths = [0] * 10 + [i * 5 for i in range(1, 31)]
+    saturation = find_saturation(make_samples(depths))
+
+    assert saturation is not None
+    assert saturation["at_s"] == pytest.approx(2.5)
+    assert saturation["sustained_s"] == pytest.approx(6.0)
+    assert saturation["processed_rate"] < saturation["offered_rate"]
+    assert saturation["queue_depth"] == 40
+
+
+def test_too_few_samples_is_not_saturated():
+    assert find_saturation(make_samples([0, 50, 100])) is None
+    assert find_saturation([]) is None
+
+
+# -----------------------------
+# summarise
+# -----------------------------
+def test_summarise_reports_rates_and_percentiles():
+    result = ReplayResult(
+        speedup=10.0, workers=4, offered=100, completed=98, failed=2, duration_s=4.0,
+        latencies_s=[i / 100 for i in range(1, 99)],
+        samples=make_samples([0, 3, 1, 0]),
+    )
+    summary = summarise(result)
+
+    assert summary["flows_offered"] == 100
+    assert summary["flows_completed"] == 98
+    assert summary["flows_failed"] == 2
+    assert summary["throughput_flows_per_s"] == pytest.approx(24.5)
+    assert summary["latency_s"]["p50"] == pytest.approx(0.495)
+    assert summary["latency_s"]["max"] == pytest.approx(0.98)
+    assert summary["max_queue_depth"] == 3
+    assert summary["saturated"] is False
+    assert summary["saturation"] is None
+
+
+def test_summarise_marks_saturated_run():
+    result = ReplayResult(speedup=100.0, workers=1, offered=200, completed=50, duration_s=20.0,
+                          latencies_s=[1.0] * 50, samples=make_samples([i * 5 for i in range(40)]))
+    summary = summarise(result)
+
+    assert summary["saturated"] is True
+    assert summary["saturation"]["at_s"] == 0.0
+    assert summary["max_queue_depth"] == 195
+
+
+def test_summarise_empty_run():
+    summary = summarise(ReplayResult(speedup=1.0, workers=1))
+
+    assert summary["throughput_flows_per_s"] == 0.0
+    assert summary["latency_s"]["p99"] == 0.0
+    assert summary["max_queue_depth"] == 0
+    assert summary["saturated"] is False
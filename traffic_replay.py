@@ -0,0 +1,298 @@
+"""
+Timestamp-ordered traffic replay load generator
+File: traffic_replay.py
+
+Streams CIC-IDS2018 flows in Timestamp order into the agent graph (or any
+ingestion callable) at 1x or an accelerated rate, with a pool of workers
+draining an ingestion queue. Measures:
+- sustained throughput (completed flows / second)
+- detection latency percentiles (arrival time -> pipeline done, incl. queueing)
+- queue growth over time
+- the saturation point: where the backlog starts growing for good
+
+Results are written as a JSON report.
+
+Run against a local stub LLM (no API cost):
+    python3 traffic_replay.py --stub --stub-latency 0.2 --speedup 1 10 100 --limit 2000
+
+Run against the configured real endpoints:
+    python3 traffic_replay.py --speedup 1 --limit 500
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import load_dataset
+from flow_record import FlowBatch, FlowRecord
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+@dataclass
+class ReplayResult:
+    speedup: float
+    workers: int
+    offered: int = 0
+    completed: int = 0
+    failed: int = 0
+    duration_s: float = 0.0
+    latencies_s: List[float] = field(default_factory=list)
+    # (seconds since start, queue depth, offered so far, processed so far)
+    samples: List[tuple] = field(default_factory=list)
+
+
+def prepare_flows(df: pd.DataFrame, limit: Optional[int] = None) -> tuple:
+    """
+    Sort by Timestamp and return (FlowBatch without Label, arrival offsets
+    in seconds relative to the first flow).
+    """
+    df = df.dropna(subset=["Timestamp"]).sort_values("Timestamp", kind="stable")
+    if limit:
+        df = df.head(limit)
+
+    offsets = (df["Timestamp"] - df["Timestamp"].iloc[0]).dt.total_seconds().to_numpy()
+    return FlowBatch.from_frame(df, exclude=("Label",)), offsets
+
+
+def replay(
+    rows: FlowBatch,
+    offsets: np.ndarray,
+    handler: Callable[[FlowRecord], Any],
+    speedup: float = 1.0,
+    workers: int = 8,
+    sample_interval: float = 0.5,
+    max_queue: int = 100_000,
+) -> ReplayResult:
+    """
+    Feed `rows` to `handler` at their recorded arrival offsets divided by
+    `speedup`. A producer thread enqueues flows on schedule; `workers`
+    threads call the handler. If the queue reaches `max_queue` the replay
+    stops offering new flows (the pipeline is hopelessly saturated).
+    """
+    result = ReplayResult(speedup=speedup, workers=workers)
+    ingest: "queue.Queue" = queue.Queue()
+    lock = threading.Lock()
+    done = threading.Event()
+    start = time.perf_counter()
+
+    def producer():
+        for row, offset in zip(rows, offsets):
+            due = start + offset / speedup
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if ingest.qsize() >= max_queue:
+                print(f"⚠️ Queue reached {max_queue}, stopping replay at {speedup}x")
+                break
+            # latency is measured from the scheduled arrival, not the enqueue time
+            ingest.put((row, due))
+            with lock:
+                result.offered += 1
+        for _ in range(workers):
+            ingest.put(None)
+
+    def worker():
+        while True:
+            item = ingest.get()
+            if item is None:
+                return
+            row, arrived = item
+            try:
+                handler(row)
+                ok = True
+            except Exception as e:
+                print(f"⚠️ Flow failed: {e}")
+                ok = False
+            finished = time.perf_counter()
+            with lock:
+                if ok:
+                    result.completed += 1
+                    result.latencies_s.append(finished - arrived)
+                else:
+                    result.failed += 1
+
+    def sampler():
+        while not done.is_set():
+            with lock:
+                result.samples.append((
+                    round(time.perf_counter() - start, 3),
+                    ingest.qsize(),
+                    result.offered,
+                    result.completed + result.failed,
+                ))
+            done.wait(sample_interval)
+
+    threads = [threading.Thread(target=producer)] + [threading.Thread(target=worker) for _ in range(workers)]
+    sampler_thread = threading.Thread(target=sampler, daemon=True)
+    sampler_thread.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.set()
+    sampler_thread.join()
+
+    result.duration_s = time.perf_counter() - start
+    return result
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def find_saturation(
+    samples: List[tuple],
+    tolerance: float = 0.95,
+    min_queue: int = 10,
+    span_windows: int = 6,
+    sustain_spans: int = 2,
+) -> Optional[Dict[str, Any]]:
+    """
+    Start of the first period where the backlog keeps growing: in each of
+    `sustain_spans` consecutive spans of `span_windows` samples, the queue
+    grows by at least `min_queue` and the pipeline processes less than
+    `tolerance` of what was offered. A single burst (CIC timestamps have
+    1 s resolution) that drains within a span is not saturation.
+    """
+    def growing(prev: tuple, cur: tuple) -> bool:
+        dt = cur[0] - prev[0]
+        if dt <= 0:
+            return False
+        offered_rate = (cur[2] - prev[2]) / dt
+        processed_rate = (cur[3] - prev[3]) / dt
+        return cur[1] - prev[1] >= min_queue and processed_rate < tolerance * offered_rate
+
+    period = span_windows * sustain_spans
+    for i in range(len(samples) - period):
+        spans = [(samples[i + k * span_windows], samples[i + (k + 1) * span_windows]) for k in range(sustain_spans)]
+        if all(growing(prev, cur) for prev, cur in spans):
+            first, last = samples[i], samples[i + period]
+            dt = last[0] - first[0]
+            return {
+                "at_s": first[0],
+                "sustained_s": round(dt, 3),
+                "offered_rate": round((last[2] - first[2]) / dt, 2),
+                "processed_rate": round((last[3] - first[3]) / dt, 2),
+                "queue_depth": last[1],
+            }
+    return None
+
+
+def summarise(result: ReplayResult) -> Dict[str, Any]:
+    lat = np.asarray(result.latencies_s) if result.latencies_s else np.zeros(1)
+    saturation = find_saturation(result.samples)
+    return {
+        "speedup": result.speedup,
+        "workers": result.workers,
+        "flows_offered": result.offered,
+        "flows_completed": result.completed,
+        "flows_failed": result.failed,
+        "duration_s": round(result.duration_s, 3),
+        "throughput_flows_per_s": round(result.completed / result.duration_s, 3) if result.duration_s else 0.0,
+        "latency_s": {
+            "p50": round(float(np.percentile(lat, 50)), 4),
+            "p90": round(float(np.percentile(lat, 90)), 4),
+            "p99": round(float(np.percentile(lat, 99)), 4),
+            "max": round(float(lat.max()), 4),
+        },
+        "max_queue_depth": max((s[1] for s in result.samples), default=0),
+        "saturated": saturation is not None,
+        "saturation": saturation,
+        "queue_samples": result.samples,
+    }
+
+
+def graph_handler(model_dir: str, from_production: bool) -> Callable[[FlowRecord], Any]:
+    """
+    Fresh graph with fresh pipeline state, so every run in a sweep starts
+    from the same point: a new incident correlator, and a surrogate that is
+    either empty or a copy of the production model. The surrogate never
+    auto-saves and points at `model_dir`, never at models/.
+    """
+    # imported late so LLM_ENDPOINTS can point at the stub first
+    import cyber_management_agents2 as agents
+    from incident_correlator import IncidentCorrelator
+    from surrogate_model import SurrogateClassifier
+
+    if from_production:
+        surrogate = SurrogateClassifier.load_latest("models", save_every=0)
+        surrogate.model_dir = model_dir
+    else:
+        surrogate = SurrogateClassifier(model_dir=model_dir, save_every=0)
+    correlator = IncidentCorrelator(
+        window_s=agents.correlator.window_s,
+        escalation_factor=agents.correlator.escalation_factor,
+    )
+
+    agent_graph = agents.build_graph(surrogate, correlator)
+    return lambda row: agent_graph.invoke({"flow": row, "log": []})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay CIC-IDS2018 flows in Timestamp order")
+    parser.add_argument("--csv", default="cis-ids2018.csv")
+    parser.add_argument("--columnar", default="cis-ids2018.parquet")
+    parser.add_argument("--limit", type=int, default=1000, help="flows to replay (0 = all)")
+    parser.add_argument("--speedup", type=float, nargs="+", default=[1.0],
+                        help="one or more replay rates; several values run a sweep")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--stub", action="store_true", help="use a local stub LLM instead of the real API")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--stub-jitter", type=float, default=0.05)
+    parser.add_argument("--report", default="results/replay_report.json")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from stub_llm_server import start_stub_server
+        stub, url = start_stub_server(latency=args.stub_latency, jitter=args.stub_jitter)
+        os.environ["LLM_ENDPOINTS"] = json.dumps([{"name": "stub", "base_url": url, "api_key": "stub"}])
+        print(f"🧪 Stub LLM on {url}")
+
+    rows, offsets = prepare_flows(load_dataset(args.csv, args.columnar), limit=args.limit or None)
+    # stub verdicts must never reach the production surrogate, not even as a starting point
+    from_production = not args.stub
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="replay_models_") as model_dir:
+        for speedup in args.speedup:
+            print(f"▶️ Replaying {len(rows)} flows at {speedup}x with {args.workers} workers")
+            handler = graph_handler(model_dir, from_production)
+            summary = summarise(replay(rows, offsets, handler, speedup=speedup, workers=args.workers))
+            print(f"   throughput {summary['throughput_flows_per_s']} flows/s, "
+                  f"p99 latency {summary['latency_s']['p99']}s, saturated={summary['saturated']}")
+            runs.append(summary)
+
+    sustainable = [r["speedup"] for r in runs if not r["saturated"]]
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "llm": "stub" if args.stub else "configured endpoints",
+        "stub_latency_s": args.stub_latency if args.stub else None,
+        "surrogate_start": "production" if from_production else "fresh",
+        "flows": len(rows),
+        "replay_span_s": float(offsets[-1]) if len(offsets) else 0.0,
+        "max_sustainable_speedup": max(sustainable) if sustainable else None,
+        "runs": runs,
+    }
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Replay report written to {args.report}")
+
+    if stub is not None:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()